@@ -74,6 +74,10 @@ class InstanceArray(InstanceProperty):
     
     def copy(self):
         raise NotImplementedError()
+
+    def _clone(self):
+        """Return a property with the same specification but without values"""
+        raise NotImplementedError()
     
     @property
     def size(self):
@@ -82,6 +86,11 @@ class InstanceArray(InstanceProperty):
         else:
             return len(self.value)
     
+    def _set_trusted_value(self, value):
+        """Set a value derived from already validated values, without
+        validating it again"""
+        InstanceArray.value.__set__(self, value)
+    
     @property
     def value(self):
         return self._value
@@ -117,7 +126,18 @@ class InstanceArray(InstanceProperty):
                 return obj
     
     def sub(self, index):
-        """Return a sub-attribute"""
+        """Return a sub-attribute. If *index* is a slice, the values of the
+        sub-attribute are a view on the original ones."""
+        # A subset of a valid value is valid as well
+        if isinstance(index, slice):
+            inst = self._clone()
+            value = self.value[index] if self.value is not None else None
+            # Empty values are None, as in empty()
+            if value is not None and len(value) == 0:
+                value = None
+            inst._set_trusted_value(value)
+            return inst
+        
         index = np.asarray(index)
         if index.dtype == 'bool':
             index = index.nonzero()[0]
@@ -125,13 +145,8 @@ class InstanceArray(InstanceProperty):
         if self.size < len(index):
             raise ValueError('Can\'t subset "{}": index ({}) is bigger than the number of elements ({})'.format(self.name, len(index), self.size))
         
-        inst = self.copy()
-        size = len(index)
-        inst.empty(size)
-        
-        if len(index) > 0:
-            inst.value = self.value.take(index, axis=0)
-        
+        inst = self._clone()
+        inst._set_trusted_value(self.value.take(index, axis=0) if len(index) > 0 else None)
         return inst
 
 class InstanceAttribute(InstanceArray):
@@ -147,13 +162,16 @@ class InstanceAttribute(InstanceArray):
         self.value = None
     
     def copy(self):
-        obj = type(self)(self.name,
-                         shape=self.shape,
-                         dtype=self.dtype,
-                         dim=self.dim,
-                         alias=self.alias)
+        obj = self._clone()
         obj.value = self.value.copy() if self.value is not None else None
         return obj
+
+    def _clone(self):
+        return type(self)(self.name,
+                          shape=self.shape,
+                          dtype=self.dtype,
+                          dim=self.dim,
+                          alias=self.alias)
     
     def field(self, index):
         obj = InstanceField(name=self.name, dtype=self.dtype, shape=self.shape, alias=self.alias)
@@ -213,14 +231,19 @@ class InstanceRelation(InstanceArray):
         self.dim = dim
         self.alias = alias
         self.shape = shape
+        self.version = 0
         self.value = None
 
     def copy(self):
-        obj = type(self)(self.name, self.map, self.index, self.dim, self.shape, self.alias)
-        obj.value = self.value.copy() if self.value is not None else None
+        obj = self._clone()
         obj.index = self.index.copy() if self.index is not None else None
+        # The value was already validated when it was set
+        obj._set_trusted_value(self.value.copy() if self.value is not None else None)
         return obj
 
+    def _clone(self):
+        return type(self)(self.name, self.map, self.index, self.dim, self.shape, self.alias)
+
     def append(self, rel):
         newix = rel.index + len(self.index)
         newrel = rel.remap(rel.index, newix, inplace=False)
@@ -260,12 +283,14 @@ class InstanceRelation(InstanceArray):
         stupidhash[np.array(from_map)] = to_map
         mapped = stupidhash.take(self.value.flatten('F'), mode='clip')
 
+        # The values are only renamed, it is up to the caller to update
+        # the index accordingly
         if inplace:
             # Flatten and back
-            self.value = mapped.reshape(self.value.shape, order='F')
+            self._set_trusted_value(mapped.reshape(self.value.shape, order='F'))
         else:
             obj = self.copy()
-            obj.value = mapped.reshape(self.value.shape, order='F')
+            obj._set_trusted_value(mapped.reshape(self.value.shape, order='F'))
             return obj
 
     def reindex(self, inplace=True):
@@ -333,14 +358,21 @@ class InstanceRelation(InstanceArray):
         else:
             # We have to check that all the values in the map are in the index
             # as well
-            ix_value = set(np.asarray(value).flatten())
-            ix_max = set(self.index)
-            
-            if ix_value > ix_max:
+            ix_value = np.unique(value)
+            ix_max = np.unique(self.index)
+            missing = np.setdiff1d(ix_value, ix_max, assume_unique=True)
+
+            if (len(missing) > 0 and
+                np.setdiff1d(ix_max, ix_value, assume_unique=True).size == 0):
                 raise ValueError('Error setting relation "{}". Values {} not present in index'
-                                 .format(self.name, list(ix_value - ix_max)))
+                                 .format(self.name, missing.tolist()))
         
+        self._set_trusted_value(value)
+    
+    def _set_trusted_value(self, value):
         InstanceArray.value.__set__(self, value)
+        # Incremented each time the value is set
+        self.version += 1
 
     def __repr__(self):
         value_str = str(self.value).replace('\n', '')
@@ -367,7 +399,7 @@ class InstanceField(InstanceProperty):
     
     def copy(self):
         inst = InstanceField(self.name, self.dtype, self.shape, self.alias)
-        inst.value = self.value
+        inst.value = self.value.copy() if isinstance(self.value, np.ndarray) else self.value
         return inst
     @property
     def value(self):
@@ -44,15 +44,13 @@ class ChemicalEntity(object):
             
         return instance
     
-    def __getattribute__(self, name):
+    def __getattr__(self, name):
+        # Called only when the regular attribute lookup fails
         try:
-            return super(ChemicalEntity, self).__getattribute__(name)
-        except AttributeError as exc:
-            try:
-                return self.get_attribute(name, alias=True).value
-            except KeyError:
-                pass
-            raise exc
+            return self.get_attribute(name, alias=True).value
+        except KeyError:
+            raise AttributeError("'{}' object has no attribute '{}'"
+                                 .format(type(self).__name__, name))
     
     def __setattr__(self, name, value):
         try:
@@ -65,28 +63,37 @@ class ChemicalEntity(object):
         except KeyError:
             super(ChemicalEntity, self).__setattr__(name, value)
     
-    def get_attribute(self, name, alias=False):
-        
-        prop_dict = merge_dicts(self.__attributes__,
-                                self.__fields__,
-                                self.__relations__)
-        if alias:
-            prop_dict.update({v.alias : v for v in prop_dict.values() if v.alias is not None})
+    @classmethod
+    def _property_lookup(cls, alias=False):
+        """Return a dictionary that maps the name of each property of the
+        class to the dictionary where it is stored and its key. The
+        lookup is computed once per class."""
+        if '_property_lookup_cache' not in cls.__dict__:
+            names = {}
+            for kind in ('__attributes__', '__fields__', '__relations__'):
+                names.update((name, (kind, name)) for name in getattr(cls, kind))
+            
+            aliases = dict(names)
+            for name, (kind, _) in names.items():
+                prop_alias = getattr(cls, kind)[name].alias
+                if prop_alias is not None:
+                    aliases[prop_alias] = (kind, name)
+            
+            cls._property_lookup_cache = (names, aliases)
         
-        if name not in prop_dict:
+        return cls._property_lookup_cache[alias]
+    
+    def get_attribute(self, name, alias=False):
+        try:
+            kind, key = self._property_lookup(bool(alias))[name]
+        except KeyError:
             raise KeyError('Attribute "{}" not present in class "{}"'.format(name, type(self)))
         
-        return prop_dict[name]
+        return getattr(self, kind)[key]
 
     def has_attribute(self, name, alias=False):
         """Check if the entity contains the attribute *name*"""
-        prop_dict = merge_dicts(self.__attributes__,
-                                self.__fields__,
-                                self.__relations__)
-        if alias:
-            prop_dict.update({v.alias : v for v in prop_dict.values() if v.alias is not None})
-        
-        return name in prop_dict
+        return name in self._property_lookup(bool(alias))
     
     @classmethod
     def empty(cls, **kwargs):
@@ -211,12 +218,14 @@ class ChemicalEntity(object):
                 subattr_map = InstanceRelation('map', map=newdim, 
                                                 dim=dim, 
                                                 index=range(self.dimensions[newdim]))
-                subattr_map.value = np.concatenate([[i] * e.dimensions[dim] for i, e in enumerate(entities)])
+                sizes = np.fromiter((e.dimensions[dim] for e in entities),
+                                    dtype='int', count=len(entities))
+                subattr_map.value = np.repeat(np.arange(len(entities), dtype='int'), sizes)
                 
                 # TODO: redundant
                 self.maps[dim, newdim] = subattr_map
                 
-                self.dimensions[dim] = sum(e.dimensions[dim] for e in entities)
+                self.dimensions[dim] = int(sizes.sum())
 
         for name, attr in self.__attributes__.items():
             # Copy only existing fields or attributes
@@ -326,7 +335,7 @@ class ChemicalEntity(object):
                 # Update the sub-attribute structure to accomodate for
                 # extra attributes
                 additional_map = InstanceRelation('map', map=newdim, dim=dim, index=[0])
-                additional_map.value = [0] * entity.dimensions[dim]
+                additional_map.value = np.zeros(entity.dimensions[dim], dtype='int')
                 # That get appended and transformed
                 self.maps[dim, newdim].append(additional_map)
                 
@@ -341,65 +350,120 @@ class ChemicalEntity(object):
     
         
     def subentity(self, Entity, index):
-        """Return child entity"""
+        """Return child entity.
+        
+        When the elements of the child are stored contiguously in the
+        parent (the common case) the child attributes are views on the
+        parent arrays rather than copies.
+        """
+        return self.subentities(Entity, [index])[0]
+
+    def subentities(self, Entity, indices):
+        """Return a list of child entities, one for each index in
+        *indices*. See also subentity.
+
+        """
         dim = Entity.__dimension__
-        entity = Entity.empty()
+        indices = np.asarray(indices, dtype='int')
         
-        if index >= self.dimensions[dim]:
+        out_of_bounds = indices[indices >= self.dimensions[dim]]
+        if len(out_of_bounds) > 0:
             raise ValueError('index {} out of bounds for dimension {} (size {})'
-                             .format(index, dim, self.dimensions[dim]))
-        
+                             .format(out_of_bounds[0], dim, self.dimensions[dim]))
+        
+        # The selections over each sub-dimension are computed only
+        # once for all the indices
+        selections = {}
+        def select(subdim):
+            if subdim not in selections:
+                selections[subdim] = self._map_selections(subdim, dim, indices)
+            return selections[subdim]
+        
+        entities = []
+        for k, index in enumerate(indices):
+            entity = Entity.empty()
+            
+            for name, attr in self.__attributes__.items():
+                if attr.dim == dim:
+                    # If the dimension of the attributes is the same of the
+                    # dimension of the entity, we generate a field
+                    entity.__fields__[name] = attr.field(index)
+                elif attr.dim in entity.dimensions:
+                    # Special case, we don't need to do anything
+                    if self.dimensions[attr.dim] == 0:
+                        continue
+
+                    # Else, we generate a subattribute
+                    mapped_index, count = select(attr.dim)[k]
+                    entity.__attributes__[name] = attr.sub(mapped_index)
+                    entity.dimensions[attr.dim] = count
+
+            for name, rel in self.__relations__.items():
+                if rel.map == dim:
+                    # The relation is between entities we need to return
+                    # which means the entity doesn't know about that
+                    pass
+                if rel.map in entity.dimensions:
+                    # Special case, we don't need to do anything
+                    if self.dimensions[rel.dim] == 0:
+                        continue
+                    mapped_index, count = select(rel.dim)[k]
+                    entity.__relations__[name] = rel.sub(mapped_index)
+                    entity.dimensions[rel.dim] = count
+                    
+                    # We need to remap values, the relation now refers
+                    # to the elements of the entity
+                    convert_index, _ = select(rel.map)[k]
+                    entity.__relations__[name].remap(index_array(convert_index),
+                                                     range(entity.dimensions[rel.map]))
+                    entity.__relations__[name].index = range(entity.dimensions[rel.map])
+            
+            entities.append(entity)
         
-        for name, attr in self.__attributes__.items():
-            if attr.dim == dim:
-                # If the dimension of the attributes is the same of the
-                # dimension of the entity, we generate a field
-                entity.__fields__[name] = attr.field(index)
-            elif attr.dim in entity.dimensions:
-                # Special case, we don't need to do anything
-                if self.dimensions[attr.dim] == 0:
-                    continue
-
-                # Else, we generate a subattribute
-                mapped_index = self.maps[attr.dim, dim].value == index
-                entity.__attributes__[name] = attr.sub(mapped_index)
-                entity.dimensions[attr.dim] = np.count_nonzero(mapped_index)
+        return entities
 
-        for name, rel in self.__relations__.items():
-            if rel.map == dim:
-                # The relation is between entities we need to return
-                # which means the entity doesn't know about that
-                pass
-            if rel.map in entity.dimensions:
-                # Special case, we don't need to do anything
-                if self.dimensions[rel.dim] == 0:
-                    continue
-                mapped_index = self.maps[rel.dim, dim].value == index
-                entity.__relations__[name] = rel.sub(mapped_index)
-                entity.dimensions[rel.dim] = np.count_nonzero(mapped_index)
-                
-                # We need to remap values
-                convert_index = self.maps[rel.map, dim].value == index
-                entity.__relations__[name].remap(convert_index.nonzero()[0],
-                                                 range(entity.dimensions[rel.map]))
-        
-        return entity
+    def _map_selections(self, dim, newdim, indices):
+        """For each element of *indices* over *newdim*, select the
+        elements of *dim* that belong to it. Return a list of pairs
+        (selection, number of elements selected).
 
+        The selections are slices if the map is sorted, arrays of
+        indices otherwise.
+        """
+        value = self.maps[dim, newdim].value
+        if np.all(value[1:] >= value[:-1]):
+            starts = np.searchsorted(value, indices).tolist()
+            stops = np.searchsorted(value, indices + 1).tolist()
+            return [(slice(start, stop), stop - start)
+                    for start, stop in zip(starts, stops)]
+        else:
+            # A stable sort groups the elements by entity, keeping
+            # their original order within each group
+            order = np.argsort(value, kind='mergesort')
+            sorted_value = value[order]
+            starts = np.searchsorted(sorted_value, indices).tolist()
+            stops = np.searchsorted(sorted_value, indices + 1).tolist()
+            return [(order[start:stop], stop - start)
+                    for start, stop in zip(starts, stops)]
 
     def _propagate_dim(self, index, dimension, propagate=True):
-        index = normalize_index(index)
-        
+        masks = self._propagate_mask(index, dimension, propagate)
+        return {k: v.nonzero()[0] for k, v in masks.items()}
+
+    def _propagate_mask(self, index, dimension, propagate=True):
+        """Same as _propagate_dim, but return boolean masks"""
         # Initialize
-        result = defaultdict(set)
-        for dim in self.dimensions:
-            result[dim] |= set(range(self.dimensions[dim]))
+        result = {dim: np.ones(n, dtype='bool') for dim, n in self.dimensions.items()}
         
-        result[dimension] &= set(index)
+        result[dimension] &= index_to_mask(index, self.dimensions[dimension])
+        # Relations and maps work on integer indices
+        index = result[dimension].nonzero()[0]
         
-        # Propagate for relations
+        # Propagate for relations, empty ones have nothing to filter
         for rel in self.__relations__.values():            
-            if rel.map == dimension:
-                result[rel.dim] &= set(rel.argfilter(index))
+            if rel.map == dimension and rel.size > 0:
+                result[rel.dim] &= index_to_mask(rel.argfilter(index),
+                                                 self.dimensions[rel.dim])
         
         # Propagate for the attribute maps
         for (a, b), rel in self.maps.items():
@@ -407,17 +471,21 @@ class ChemicalEntity(object):
             if not propagate: continue
             
             if a == dimension:
-                result[b] &= set(np.unique(rel.sub(index).value))                
+                mapped = rel.sub(index).value
+                if mapped is None:
+                    result[b][:] = False
+                else:
+                    result[b] &= index_to_mask(mapped, self.dimensions[b])
                 # We need to propagate for the attributes that changed
-                prop = self._propagate_dim(np.array(sorted(result[b]), 'int'), b)
+                prop = self._propagate_mask(result[b], b)
                 for r in result:
-                    result[r] &= set(prop[r])
+                    result[r] &= prop[r]
             
-            if b == dimension:
-                result[rel.dim] &= set(rel.argfilter(index))
-
+            if b == dimension and rel.size > 0:
+                result[rel.dim] &= index_to_mask(rel.argfilter(index),
+                                                 self.dimensions[rel.dim])
 
-        return {k: np.array(sorted(v), 'int') for k, v in result.items()}
+        return result
     
     def subindex(self, filter_, inplace=False):
         if not inplace:
@@ -448,7 +516,7 @@ class ChemicalEntity(object):
         
         If other dimensions depend on this one those are updated accordingly.
         """
-        filter_ = self._propagate_dim(index, dimension, propagate)
+        filter_ = self._propagate_mask(index, dimension, propagate)
         return self.subindex(filter_, inplace)
     
     def shrink_dimension(self, newdim, dimension):
@@ -547,8 +615,10 @@ class ChemicalEntity(object):
         # Create new entity
         if inplace:
             obj = self
-        else:
+        elif self.is_empty():
             obj = self.copy()
+        else:
+            return self._concat_new(other)
         
         # Stitch every attribute
         for name, attr in obj.__attributes__.items():
@@ -572,6 +642,24 @@ class ChemicalEntity(object):
         
         return obj
     
+    def _concat_new(self, other):
+        '''Concatenate into a new entity, each array is allocated only once'''
+        obj = type(self).__new__(type(self))
+        
+        for name, attr in self.__attributes__.items():
+            obj.__attributes__[name] = concatenate_attributes([attr, other.__attributes__[name]])
+            obj.__attributes__[name].alias = attr.alias
+        
+        for name, rel in self.__relations__.items():
+            obj.__relations__[name] = concatenate_relations([rel, other.__relations__[name]])
+            obj.__relations__[name].alias = rel.alias
+        
+        obj.__fields__ = {k: v.copy() for k, v in self.__fields__.items()}
+        obj.maps = {k: concatenate_relations([m, other.maps[k]]) for k, m in self.maps.items()}
+        obj.dimensions = {d: n + other.dimensions[d] for d, n in self.dimensions.items()}
+        
+        return obj
+    
     def where(self, inplace=False, **kwargs):
         """Return indices over every dimension that met the conditions. 
         
@@ -603,14 +691,6 @@ class ChemicalEntity(object):
         """
         masks = {k: np.ones(v, dtype='bool') for k,v in self.dimensions.items()} 
         
-        def index_to_mask(index, n):
-            val = np.zeros(n, dtype='bool')
-            val[index] = True
-            return val
-        
-        def masks_and(dict1, dict2):
-            return {k: dict1[k] & index_to_mask(dict2[k], len(dict1[k])) for k in dict1 }
-        
         for key in kwargs:
             value = kwargs[key]
             if key.endswith('_index'):
@@ -618,23 +698,35 @@ class ChemicalEntity(object):
                     value = [value]
                 
                 dim = key[:-len('_index')]
-                m = self._propagate_dim(value, dim)
-                masks = masks_and(masks, m)
+                m = self._propagate_mask(value, dim)
             else:
                 attribute = self.get_attribute(key)
                 
-                if isinstance(value, list):
+                if isinstance(value, list) and np.dtype(attribute.dtype).kind != 'O':
+                    # Membership is accumulated in place in a single mask
+                    mask = np.isin(attribute.value, value)
+                elif isinstance(value, list):
                     mask = reduce(operator.or_, [attribute.value == m for m in value])
                 else:
                     mask = attribute.value == value
             
-                m = self._propagate_dim(mask, attribute.dim)
-                masks = masks_and(masks, m)
+                m = self._propagate_mask(mask, attribute.dim)
+            
+            for k in masks:
+                masks[k] &= m[k]
         
         return masks
     
     def sub(self, inplace=False, **kwargs):
         """Return a entity where the conditions are met"""
+        if len(kwargs) == 1:
+            key, value = next(iter(kwargs.items()))
+            dim = key[:-len('_index')]
+            if key.endswith('_index') and dim in self.dimensions:
+                # A single index condition is a plain sub_dimension, there
+                # is no need to combine masks over all the dimensions
+                return self.sub_dimension(value, dim, inplace=inplace)
+        
         filter_ = self.where(**kwargs)
         return self.subindex(filter_, inplace)
         
@@ -742,6 +834,29 @@ def consume(iterator, n):
     return list(islice(iterator, 0, n))
 
 
+def index_array(selection):
+    """Convert a slice, a boolean mask or an array of indices into an
+    array of indices"""
+    if isinstance(selection, slice):
+        return np.arange(selection.start, selection.stop)
+    selection = np.asarray(selection)
+    if selection.dtype == 'bool':
+        return selection.nonzero()[0]
+    return selection
+
+def index_to_mask(index, n):
+    """Convert an index (integer or boolean) into a boolean mask of size n"""
+    index = np.asarray(index)
+    if index.dtype == 'bool':
+        if len(index) == n:
+            return index
+        index = index.nonzero()[0]
+    
+    mask = np.zeros(n, dtype='bool')
+    if index.size > 0:
+        mask[index] = True
+    return mask
+
 def normalize_index(index):
     """normalize numpy index"""
     index = np.asarray(index)
@@ -42,13 +42,13 @@ class Molecule(ChemicalEntity):
     def __init__(self, atoms, name=None, export=None, bonds=None):
         super(Molecule, self).__init__()
         self._from_entities(atoms, 'atom')
-        if bonds:
+        if bonds is not None and len(bonds) > 0:
             self.bonds = bonds
         
         if name:
             self.molecule_name = name
         
-        self.export = export or {}
+        self.export = {} if export is None else export
         self.molecule_name = make_formula(self.type_array)
 
     def __setattr__(self, name, value):
@@ -12,6 +12,7 @@ from .molecule import Molecule
 from .serialization import json_to_data, data_to_json
 
 from ..utils.pbc import periodic_distance
+from ..utils.distances import overlapping_points
 from ..libs.ckdtree import cKDTree
 
 class System(ChemicalEntity):
@@ -46,13 +47,7 @@ class System(ChemicalEntity):
     def __init__(self, molecules=None, box_vectors=None):
         super(System, self).__init__()
         
-        if molecules is None:
-            molecules = []
-        self.dimensions = {'molecule' : len(molecules),
-                           'atom': sum(m.dimensions['atom'] for m in molecules),
-                           'bond': sum(m.dimensions['bond'] for m in molecules),
-                           'residue': 0}
-
+        # The dimensions start at 0 and are filled from the molecules
         if molecules is not None:
             self._from_entities(molecules, 'molecule')
         
@@ -86,15 +81,31 @@ class System(ChemicalEntity):
     # Old API
     @property
     def mol_indices(self):
-        steps = np.ediff1d(self.maps['atom', 'molecule'].value)
-        steps = np.insert(steps, 0, 1)
-        return np.nonzero(steps)[0]
-    
+        return self._mol_indices_n_atoms()[0]
+
     @property
     def mol_n_atoms(self):
-        idx = self.mol_indices
-        idx = np.append(idx, len(self.maps['atom', 'molecule'].value))
-        return np.ediff1d(idx)
+        return self._mol_indices_n_atoms()[1]
+
+    def _mol_indices_n_atoms(self):
+        atom_mol = self.maps['atom', 'molecule']
+        
+        # The map version changes whenever its value is set
+        key = (atom_mol, atom_mol.version)
+        cache = getattr(self, '_mol_indices_cache', None)
+        if cache is None or cache[0][0] is not key[0] or cache[0][1] != key[1]:
+            atom_mol = np.asarray(atom_mol.value)
+            # A molecule starts wherever the atom->molecule map changes value
+            mask = np.empty(atom_mol.size, dtype='bool')
+            mask[:1] = True
+            np.not_equal(atom_mol[1:], atom_mol[:-1], out=mask[1:])
+            
+            mol_indices = np.flatnonzero(mask)
+            mol_n_atoms = np.diff(np.append(mol_indices, atom_mol.size))
+            cache = self._mol_indices_cache = (key, mol_indices, mol_n_atoms)
+        
+        # The cached arrays are not exposed, so callers can modify the result
+        return cache[1].copy(), cache[2].copy()
 
 
     @property
@@ -186,8 +197,79 @@ class System(ChemicalEntity):
         
         return super(System, cls).from_arrays(**kwargs)
 
+    @classmethod
+    def frame_loader(cls, **kwargs):
+        """Return a function that builds a System for each frame of a
+        trajectory, given its coordinates.
+
+        The arguments that are constant over the trajectory (such as
+        *type_array*, *bonds* and *maps*) are the same as
+        :py:meth:`System.from_arrays` and are processed only once. Each
+        System returned has its own copy of the arrays, including
+        *r_array*. The box of each frame can be passed to the function
+        as *box_vectors*.
+
+        **Example**
+        ::
+
+            load = System.frame_loader(type_array=type_array, maps=maps)
+            for r_array, box_vectors in frames:
+                system = load(r_array, box_vectors=box_vectors)
+
+        """
+        template = cls.from_arrays(**kwargs)
+        n_atoms = template.n_atoms
+
+        def load(r_array, box_vectors=None):
+            r_array = np.array(r_array, dtype='float')
+            if r_array.shape != (n_atoms, 3):
+                raise ValueError('r_array has shape {}, expected {}'
+                                 .format(r_array.shape, (n_atoms, 3)))
+            
+            # Copy the template arrays directly, without going through
+            # the zero-filled arrays of copy()
+            frame = cls.__new__(cls)
+            frame.__attributes__ = {k: v.copy() for k, v in template.__attributes__.items()
+                                    if k != 'r_array'}
+            frame.__fields__ = {k: v.copy() for k, v in template.__fields__.items()}
+            frame.__relations__ = {k: v.copy() for k, v in template.__relations__.items()}
+            frame.maps = {k: m.copy() for k, m in template.maps.items()}
+            frame.dimensions = template.dimensions.copy()
+            
+            r_attr = template.__attributes__['r_array']._clone()
+            r_attr.value = r_array
+            frame.__attributes__['r_array'] = r_attr
+            
+            if box_vectors is not None:
+                frame.box_vectors = np.array(box_vectors, dtype='float')
+            return frame
+        
+        return load
+
     def get_molecule(self, index):
+        """Return the molecule at *index*.
+
+        The atomic arrays of the returned molecule (such as
+        ``r_array``) are views on the arrays of the system, use
+        ``Molecule.copy`` to obtain an independent molecule.
+        """
         return self.subentity(Molecule, index)
+
+    def get_molecules(self, indices):
+        """Return a list of the molecules at *indices*. This is faster
+        than calling get_molecule repeatedly, see get_molecule for
+        details.
+
+        """
+        return self.subentities(Molecule, indices)
+
+    def get_atom(self, index):
+        """Return the atom at *index*."""
+        return self.subentity(Atom, index)
+
+    def get_atoms(self, indices):
+        """Return a list of the atoms at *indices*."""
+        return self.subentities(Atom, indices)
     
     def add(self, molecule):
         self.add_entity(molecule, Molecule)
@@ -243,14 +325,6 @@ class System(ChemicalEntity):
         """Return indices that met the conditions"""
         masks = super(System, self).where(inplace=inplace, **kwargs)
         
-        def index_to_mask(index, n):
-            val = np.zeros(n, dtype='bool')
-            val[index] = True
-            return val
-        
-        def masks_and(dict1, dict2):
-            return {k: dict1[k] & index_to_mask(dict2[k], len(dict1[k])) for k in dict1 }
-        
         if within_of is not None:
             if self.box_vectors is None:
                 raise Exception('Only periodic distance supported')
@@ -268,8 +342,9 @@ class System(ChemicalEntity):
                                      periodic=self.box_vectors.diagonal())
             
             atoms = (dist <= thr).sum(axis=0, dtype='bool')
-            m = self._propagate_dim(atoms, 'atom')
-            masks = masks_and(masks, m)
+            m = self._propagate_mask(atoms, 'atom')
+            for k in masks:
+                masks[k] &= m[k]
         
         return masks
 
@@ -306,15 +381,13 @@ class MoleculeGenerator(object):
 
     def __getitem__(self, key):
         if isinstance(key, slice):
-            ind = range(*key.indices(self.system.n_mol))
-            ret = []
-            for i in ind:
-                ret.append(self.system.get_molecule(i))
+            return self.system.get_molecules(range(*key.indices(self.system.n_mol)))
 
-            return ret
+        if isinstance(key, (int, np.integer)):
+            return self.system.get_molecule(_generator_index(int(key), self.system.n_mol))
 
-        if isinstance(key, int):
-            return self.system.get_molecule(key)
+        if isinstance(key, (list, np.ndarray)):
+            return self.system.get_molecules(_generator_index(key, self.system.n_mol))
 
 
 class AtomGenerator(object):
@@ -323,15 +396,35 @@ class AtomGenerator(object):
 
     def __getitem__(self, key):
         if isinstance(key, slice):
-            ind = range(*key.indices(self.system.n_mol))
-            ret = []
-            for i in ind:
-                ret.append(self.system.get_atom(i))
+            return self.system.get_atoms(range(*key.indices(self.system.n_atoms)))
 
-            return ret
+        if isinstance(key, (int, np.integer)):
+            return self.system.get_atom(_generator_index(int(key), self.system.n_atoms))
 
-        if isinstance(key, int):
-            return self.system.get_atom(key)
+        if isinstance(key, (list, np.ndarray)):
+            return self.system.get_atoms(_generator_index(key, self.system.n_atoms))
+
+
+def _generator_index(key, n):
+    '''Convert an integer, an integer array or a boolean array into
+    non-negative indices for a dimension of size *n*'''
+    key = np.asarray(key)
+    if key.dtype == 'bool':
+        if key.ndim != 1 or len(key) != n:
+            raise IndexError('boolean index has shape {}, expected ({},)'
+                             .format(key.shape, n))
+        return np.flatnonzero(key)
+    
+    if key.dtype.kind not in 'iu':
+        if key.size > 0:
+            raise IndexError('only integer or boolean arrays are valid indices')
+        key = key.astype('int')
+    
+    if np.any((key < -n) | (key >= n)):
+        raise IndexError('index out of range for size {}'.format(n))
+    
+    key = key % n if n > 0 else key
+    return int(key) if key.ndim == 0 else key
 
 
 def subsystem_from_molecules(orig, selection):
@@ -431,24 +524,16 @@ def merge_systems(sysa, sysb, bounding=0.2):
         p = overlapping_points(sysb.r_array, sysa.r_array,
                                cutoff=bounding, periodic=periodicity)
 
-        sel = np.ones(len(sysa.r_array), dtype=np.bool)
-        sel[p] = False
+        if len(p) > 0:
+            sel = np.ones(len(sysa.r_array), dtype='bool')
+            sel[p] = False
 
-        # Rebuild sysa without water molecules
-        sysa = subsystem_from_atoms(sysa, sel)
-    
-    sysres = System.empty(sysa.n_mol + sysb.n_mol, sysa.n_atoms + sysb.n_atoms)
-    
-    # Assign the attributes
-    for attr in type(sysa).attributes:
-        attr.assign(sysres,
-                    attr.concatenate(sysa, sysb))
+            # Rebuild sysa without water molecules
+            sysa = subsystem_from_atoms(sysa, sel)
     
-    # edit the mol_indices and n_mol
-    offset = sysa.mol_indices[-1] + sysa.mol_n_atoms[-1]
-    sysres.mol_indices[0:sysa.n_mol] = sysa.mol_indices.copy()
-    sysres.mol_indices[sysa.n_mol:] = sysb.mol_indices.copy() + offset
-    sysres.mol_n_atoms = np.concatenate([sysa.mol_n_atoms, sysb.mol_n_atoms])
+    # Every attribute is concatenated directly in the new system, the
+    # maps are offset as well so mol_indices and mol_n_atoms follow
+    sysres = sysa.concat(sysb)
     
     sysres.box_vectors = sysa.box_vectors
     
@@ -1,12 +1,15 @@
 '''Analysis for statistical ensembles'''
 import numpy as np
 import time
+from multiprocessing import cpu_count
+from multiprocessing.pool import ThreadPool
 from scipy.spatial import distance
 from chemlab.utils.celllinkedlist import CellLinkedList
-from chemlab.utils import distances_within
+from chemlab.utils.cdist import distance_histogram
+from chemlab.utils.neighbors import neighbor_list
 
 def rdf(coords_a, coords_b, binsize=0.002,
-        cutoff=1.5, periodic=None, normalize=True):
+        cutoff=1.5, periodic=None, normalize=True, out=None):
     """Calculate the radial distribution function of *coords_a* against
     *coords_b*.
 
@@ -21,20 +24,42 @@ def rdf(coords_a, coords_b, binsize=0.002,
         gromacs-like normalization
     - cutoff: 
         where to cutoff the RDF
+    - out: np.ndarray(int64) or None
+        if given, the pair counts are accumulated in this array
+        instead of a newly allocated one. Requires normalize=False.
     
     """
     
-    period = periodic[0, 0], periodic[1,1], periodic[2,2]
-    distances = distances_within(coords_a, coords_b, cutoff,
-                                 np.array(period, dtype=np.double))
+    period = np.array([periodic[0, 0], periodic[1,1], periodic[2,2]], dtype=np.double)
     
     n_a = len(coords_a)
     n_b = len(coords_b)
 
     volume = periodic[0, 0] * periodic[1, 1] * periodic[2, 2]
 
-    int_distances = np.rint(distances/binsize).astype(int)
-    hist = np.bincount(int_distances)
+    coords_a = np.asarray(coords_a, dtype=np.double)
+    coords_b = np.asarray(coords_b, dtype=np.double)
+    
+    nbins = int(np.rint(cutoff/binsize)) + 1
+    if out is None:
+        hist = np.zeros(nbins, dtype=np.int64)
+    else:
+        if normalize:
+            raise ValueError('out can be used only with normalize=False')
+        if out.dtype != np.int64 or len(out) < nbins:
+            raise ValueError('out should be an int64 array of at least {} elements'
+                             .format(nbins))
+        hist = out
+    
+    sphere = 4.0/3.0 * np.pi * cutoff**3
+    if cutoff < period.min() / 2 and sphere < 0.02 * volume:
+        # Only a small fraction of the pairs is within the cutoff, we
+        # visit just those
+        _neighbor_histogram(coords_a, coords_b, period, cutoff, binsize, hist)
+    else:
+        # The cutoff sphere covers a large part of the box, we bin all
+        # the distances directly, without storing them
+        distance_histogram(coords_a, coords_b, period, cutoff, binsize, hist)
     
     bin_edges = np.arange(len(hist)+1) * binsize
         
@@ -53,28 +78,61 @@ def rdf(coords_a, coords_b, binsize=0.002,
 
     # Cutting up to rmax value
         
-    width = cutoff/binsize + 1
+    width = int(cutoff/binsize) + 1
     return bin_edges[0:width], hist[0:width]
 
-def rdf_multi(frames_a, frames_b, sel_a, sel_b,
-              periodic, binsize=0.002):
+def _neighbor_histogram(coords_a, coords_b, period, cutoff, binsize, hist):
+    """Same as distance_histogram, using a neighbor list to find the
+    pairs within the cutoff."""
+    ilist, irange, jlist = neighbor_list(coords_a, coords_b, period, cutoff)
+    
+    # The neighbors are grouped by i, so all pairs are processed at once
+    dr = coords_b[jlist] - coords_a[np.repeat(ilist, np.diff(irange))]
+    dr -= period * np.rint(dr / period)
+    distances = np.sqrt((dr ** 2).sum(axis=1))
+    distances = distances[(distances > 0) & (distances <= cutoff)]
+    
+    bins = np.rint(distances / binsize).astype(int)
+    hist += np.bincount(bins[bins < len(hist)], minlength=len(hist))
 
+def rdf_multi(frames_a, frames_b, sel_a, sel_b,
+              periodic, binsize=0.002, n_jobs=None):
+    """Calculate the radial distribution function averaged over
+    multiple frames. The frames are processed in parallel by *n_jobs*
+    threads (by default, one per CPU).
+    
+    """
     # I can take unnormalized stuff and normalize at the end
     nframes = len(frames_a)
     rmax = (periodic[0][0,0]/2.0) * 0.99
     nbins = int(rmax / binsize)
-    hist = np.zeros(nbins + 1)
+    
+    def chunk_hist(frames):
+        # A single buffer accumulates the counts of all the frames in
+        # the chunk
+        out = np.zeros(int(np.rint(rmax/binsize)) + 1, dtype=np.int64)
+        for i in frames:
+            rdf(frames_a[i][sel_a], frames_b[i][sel_b],
+                periodic=periodic[i], cutoff=rmax,
+                normalize=False, binsize=binsize, out=out)
+        return out
+    
+    # With a cutoff of half the box rdf bins the pairs with
+    # distance_histogram, which releases the GIL. Frames are independent.
+    n_jobs = n_jobs or cpu_count()
+    chunks = np.array_split(np.arange(nframes), min(n_jobs, nframes))
+    pool = ThreadPool(len(chunks))
+    try:
+        hist = np.zeros(nbins + 1)
+        for out in pool.imap_unordered(chunk_hist, chunks):
+            hist += out[:nbins + 1]
+    finally:
+        pool.close()
     
     volume = 0.0
-    for i in range(nframes):
-        bins, hist_f = rdf(frames_a[i][sel_a], frames_b[i][sel_b],
-                           periodic=periodic[i], cutoff=rmax,
-                           normalize=False, binsize=binsize)
-        p = periodic[i]
+    for p in periodic[:nframes]:
         volume += p[0,0] * p[1,1] * p[2,2]
         
-        hist += hist_f
-        
     volume /= nframes
     hist /= nframes
 
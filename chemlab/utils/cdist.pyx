@@ -7,43 +7,86 @@ cimport numpy as np
 cimport cython
 from scipy.sparse import dok_matrix
 
-from libc.math cimport sqrt, floor
+from libc.math cimport sqrt
 
 @cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
 def distance_array(arr_a, arr_b, double[:] period, double cutoff):
     cdef int i, j
     cdef int na = len(arr_a), nb = len(arr_b)
-    cdef int size
-    cdef double dist
-    
-    cdef double[:] distbuf
+    cdef double dx, dy, dz, dist
+    cdef double px = period[0], py = period[1], pz = period[2]
+    cdef double ipx = 1.0 / px, ipy = 1.0 / py, ipz = 1.0 / pz
     
-    cdef double[:,:] bufa = arr_a.astype(np.double)
-    cdef double[:,:] bufb = arr_b.astype(np.double)
+    cdef double[:,:] bufa = np.asarray(arr_a, dtype=np.double)
+    # The components of arr_b are stored separately so that the inner
+    # loop reads contiguous memory
+    cdef double[:,::1] bufb = np.ascontiguousarray(np.asarray(arr_b, dtype=np.double).T)
     
     distmat = np.zeros((na, nb), np.double)
-    cdef double[:,:] d_mat = distmat
+    cdef double[:,::1] d_mat = distmat
     
-    for i in range(na):
-        for j in range(nb):
-            dist = minimum_image_distance(bufa[i], bufb[j], period)
-            if dist <= cutoff:
-                d_mat[i,j] = dist
+    with nogil:
+        for i in range(na):
+            for j in range(nb):
+                dx = minimum_image(bufb[0, j] - bufa[i, 0], px, ipx)
+                dy = minimum_image(bufb[1, j] - bufa[i, 1], py, ipy)
+                dz = minimum_image(bufb[2, j] - bufa[i, 2], pz, ipz)
+                dist = sqrt(dx*dx + dy*dy + dz*dz)
+                if dist <= cutoff:
+                    d_mat[i,j] = dist
     
     return distmat
         
 
+cdef inline double minimum_image(double d, double period, double inv_period) nogil:
+    '''Minimum image of the displacement *d* along a periodic dimension'''
+    return d - period * rint(d * inv_period)
+
 @cython.cdivision(True)
 @cython.boundscheck(False)
 cdef inline double minimum_image_distance(double[:] a,double[:] b, double[:] periodic) nogil:
     cdef double d[3]
-    cdef double a_can, b_can 
     
     for i in range(3):
-        a_can = a[i] - floor(a[i]/periodic[i]) * periodic[i]
-        b_can = b[i] - floor(b[i]/periodic[i]) * periodic[i]
-        
-        d[i] = b_can - a_can
-        d[i] = d[i] - periodic[i] * rint(d[i]/periodic[i])
+        d[i] = minimum_image(b[i] - a[i], periodic[i], 1.0 / periodic[i])
     
     return sqrt(d[0]*d[0] + d[1]*d[1] + d[2]*d[2])
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+def distance_histogram(double[:, :] coords_a, double[:, :] coords_b,
+                       double[:] period, double cutoff, double binsize,
+                       np.int64_t[:] hist):
+    '''Bin the minimum image distances between *coords_a* and
+    *coords_b* that are within *cutoff*, adding the counts to *hist*.
+    Distance d falls in the bin rint(d/binsize), zero distances
+    are not counted.
+
+    '''
+    cdef int i, j, b
+    cdef int na = coords_a.shape[0], nb = coords_b.shape[0]
+    cdef int nbins = hist.shape[0]
+    cdef double dx, dy, dz, d2
+    cdef double px = period[0], py = period[1], pz = period[2]
+    cdef double ipx = 1.0 / px, ipy = 1.0 / py, ipz = 1.0 / pz
+    cdef double cutoff2 = cutoff * cutoff
+    cdef double inv_binsize = 1.0 / binsize
+    
+    # Components stored separately, as in distance_array
+    cdef double[:,::1] bufb = np.ascontiguousarray(np.asarray(coords_b).T)
+    
+    with nogil:
+        for i in range(na):
+            for j in range(nb):
+                dx = minimum_image(bufb[0, j] - coords_a[i, 0], px, ipx)
+                dy = minimum_image(bufb[1, j] - coords_a[i, 1], py, ipy)
+                dz = minimum_image(bufb[2, j] - coords_a[i, 2], pz, ipz)
+                d2 = dx*dx + dy*dy + dz*dz
+                
+                if d2 > 0.0 and d2 <= cutoff2:
+                    b = <int> rint(sqrt(d2) * inv_binsize)
+                    if b < nbins:
+                        hist[b] += 1
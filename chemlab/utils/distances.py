@@ -1,10 +1,12 @@
 # Utilities for distance searching
 import numpy as np
+from scipy import spatial
 from scipy.spatial.distance import cdist, squareform
 
 from ..libs.ckdtree import cKDTree
 from .cdist import distance_array
 from .celllinkedlist import CellLinkedList
+from .pbc import minimum_image
 
 def distances_within(coords_a, coords_b, cutoff,
                      periodic=False, method="simple"):
@@ -109,11 +111,26 @@ def overlapping_points(coords_a, coords_b, cutoff, periodic=False):
        Distance within two points are considered overlapping.
     
     periodic: False or np.ndarray(3)
-       Periodicity in x, y, z dimensions
+       Periodicity in x, y, z dimensions. A box with zero lengths
+       (such as the default System box) is not periodic.
     
     '''
+    coords_a = np.asarray(coords_a, dtype='float')
+    coords_b = np.asarray(coords_b, dtype='float')
     
-    res = distance_matrix(coords_a, coords_b, periodic=periodic, 
-                          cutoff=cutoff, method="cell-lists")
-    overlaps = res.nonzero()[1]
-    return np.unique(overlaps)
+    if periodic is not False and periodic is not None:
+        periodic = np.asarray(periodic, dtype='float')
+        if not np.all(periodic > 0):
+            periodic = False
+    
+    if periodic is not False and periodic is not None:
+        # The periodic tree requires the points inside the box
+        coords_a = minimum_image(coords_a, periodic)
+        coords_b = minimum_image(coords_b, periodic)
+        tree = spatial.cKDTree(coords_a, boxsize=periodic)
+    else:
+        tree = spatial.cKDTree(coords_a)
+    
+    # Distance to the closest point of coords_a, inf if farther than cutoff
+    dist, _ = tree.query(coords_b, k=1, distance_upper_bound=cutoff)
+    return np.flatnonzero(np.isfinite(dist))
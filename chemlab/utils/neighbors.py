@@ -7,9 +7,12 @@
 
 import numpy as np
 import collections
+import itertools
 
 # Our searches use mainly a periodic variant of KDTree
 from ..libs.periodic_kdtree import PeriodicCKDTree
+from scipy.spatial import cKDTree
+from .pbc import minimum_image
 
 def _check_coordinates(coordinates):
     '''Validate coordinate-like input'''
@@ -95,3 +98,33 @@ def count_neighbors(coordinates_a, coordinates_b, periodic, r):
         return [len(ix) for ix in indices]
     else:
         return len(indices)
+
+def neighbor_list(coordinates_a, coordinates_b, periodic, r):
+    '''Find the points of *coordinates_b* within a distance *r* from
+    each point of *coordinates_a*, using the minimum image convention.
+
+    The result is returned in compressed form as the tuple (ilist,
+    irange, jlist): the neighbors of the point ilist[k] are
+    jlist[irange[k]:irange[k+1]].
+
+    :param np.ndarray coordinates_a: Array of coordinates of shape (NA, 3)
+    :param np.ndarray coordinates_b: Array of coordinates of shape (NB, 3)
+    :param np.ndarray periodic: Either a matrix of box vectors (3, 3) or an
+                                array of box lengths of shape (3,). Only
+                                orthogonal boxes are supported.
+    :param float r: Radius of neighbor search
+
+    '''
+    coordinates_a = _check_coordinates(coordinates_a)
+    coordinates_b = _check_coordinates(coordinates_b)
+    periodic = _check_periodic(periodic).astype('float')
+
+    kdtree = cKDTree(minimum_image(coordinates_b, periodic), boxsize=periodic)
+    neigh = kdtree.query_ball_point(minimum_image(coordinates_a, periodic), r)
+
+    irange = np.zeros(len(neigh) + 1, dtype='int')
+    np.cumsum(np.array([len(nb) for nb in neigh], dtype='int'), out=irange[1:])
+    jlist = np.fromiter(itertools.chain.from_iterable(neigh),
+                        dtype='int', count=irange[-1])
+
+    return np.arange(len(neigh)), irange, jlist
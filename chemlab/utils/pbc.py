@@ -27,6 +27,8 @@ def minimum_image(coords, pbc):
     image_number = np.floor(coords/pbc)
     
     wrap = coords - pbc * image_number
+    # Rounding may leave points exactly on the upper boundary
+    wrap = np.where(wrap >= pbc, wrap - pbc, wrap)
     return wrap
 
 
@@ -3,7 +3,7 @@ from __future__ import division, print_function
 
 import numpy as np
 from nose.plugins.attrib import attr
-from nose.tools import assert_equals, eq_, ok_
+from nose.tools import assert_equals, assert_raises, eq_, ok_
 
 from chemlab.core import (System, crystal, merge_systems, random_box,
                           subsystem_from_atoms, subsystem_from_molecules,
@@ -44,6 +44,19 @@ class TestMolecule(object):
         eq_(mol.dimensions['atom'], 0)
         eq_(mol.dimensions['bond'], 0)
 
+    def test_bonds(self):
+        mol = Molecule([Atom("H", [0.0, 0.0, 0.0]), Atom("H", [0.0, 0.0, 0.1])],
+                       bonds=np.array([[0, 1]]))
+        assert_npequal(mol.bonds, [[0, 1]])
+
+        # A bondless molecule can be added to a system with bonds
+        na = Molecule([Atom('Na', [0.0, 0.0, 0.0])], bonds=[])
+        eq_(na.bonds, None)
+        system = System([_make_water()])
+        system.add(na)
+        eq_(system.n_bonds, 2)
+        assert_npequal(system.bonds, [[0, 1], [0, 2]])
+
     def test_copy(self):
         mol = _make_water()
         mol2 = mol.copy()
@@ -117,6 +130,26 @@ class TestSystem(object):
         [system.add(mol) for mol in mols]
         self._assert_init(system)
 
+    def test_mol_indices_cache(self):
+        mols = self._make_molecules()
+        system = System(mols[:2])
+        assert_npequal(system.mol_indices, [0, 3])
+
+        # Adding a molecule invalidates the cache
+        system.add(mols[2])
+        assert_npequal(system.mol_indices, [0, 3, 6])
+        assert_npequal(system.mol_n_atoms, [3, 3, 3])
+
+        # Setting a map modified in place invalidates the cache
+        atom_mol = system.maps['atom', 'molecule'].value
+        atom_mol[:] = [0, 0, 1, 1, 1, 1, 2, 2, 2]
+        system.maps['atom', 'molecule'].value = atom_mol
+        assert_npequal(system.mol_indices, [0, 2, 6])
+
+        # The results can be modified without affecting the cache
+        system.mol_indices[0] = 10
+        assert_npequal(system.mol_indices, [0, 2, 6])
+
     def test_from_arrays(self):
         mols = self._make_molecules()
         system = System.from_arrays(
@@ -130,6 +163,105 @@ class TestSystem(object):
             })
         self._assert_init(system)
 
+    def test_frame_loader(self):
+        mols = self._make_molecules()
+        load = System.frame_loader(
+            type_array=np.concatenate([m.type_array for m in mols]),
+            bonds=np.concatenate([m.bonds + 3 * i for i, m in enumerate(mols)
+                                  ]),
+            maps={
+                ('atom', 'molecule'): [0, 0, 0, 1, 1, 1, 2, 2, 2, 3, 3, 3],
+                ('bond', 'molecule'): [0, 0, 1, 1, 2, 2, 3, 3]
+            })
+        r_array = np.concatenate([m.r_array for m in mols])
+        system = load(r_array)
+        self._assert_init(system)
+
+        # Frames are independent of each other
+        other = load(r_array + 1.0)
+        assert_allclose(other.r_array, r_array + 1.0)
+        assert_allclose(system.r_array, r_array)
+        other.type_array[0] = 'N'
+        eq_(system.type_array[0], 'O')
+
+        # The coordinates are copied
+        r_array[0] = 100.0
+        assert_allclose(system.r_array[1:], r_array[1:])
+        ok_(system.r_array[0, 0] != 100.0)
+
+        other.box_vectors[0, 0] = 7.0
+        eq_(load(r_array).box_vectors[0, 0], 0.0)
+        assert_allclose(load(r_array, box_vectors=np.eye(3) * 2.0).box_vectors,
+                        np.eye(3) * 2.0)
+
+        with assert_raises(ValueError):
+            load(r_array[:3])
+
+    def test_get_molecule(self):
+        mols = self._make_molecules()
+        system = System(mols)
+
+        mol = system.get_molecule(2)
+        assert_npequal(mol.type_array, ['O', 'H', 'H'])
+        assert_allclose(mol.r_array, system.r_array[6:9])
+        assert_eqbonds(mol.bonds, [[0, 1], [0, 2]])
+
+        # Molecule arrays are views on the system arrays
+        ok_(np.shares_memory(mol.r_array, system.r_array))
+
+        # The bonds refer to the atoms of the molecule only, so the
+        # molecule can be added to another system
+        other = System([_make_water()])
+        other.add(mol)
+        other.add(_make_water())
+        assert_eqbonds(other.bonds, [[0, 1], [0, 2], [3, 4], [3, 5],
+                                     [6, 7], [6, 8]])
+
+        # Bondless molecules have no bonds, as when built directly
+        other.add(Molecule([Atom('Na', [0.0, 0.0, 0.0])]))
+        eq_(other.get_molecule(3).bonds, None)
+
+        mols = system.molecules[1:3]
+        eq_(len(mols), 2)
+        assert_allclose(mols[1].r_array, mol.r_array)
+        assert_eqbonds(mols[1].bonds, [[0, 1], [0, 2]])
+
+        mols = system.molecules[np.array([False, False, True, True])]
+        eq_(len(mols), 2)
+        assert_allclose(mols[0].r_array, mol.r_array)
+
+        atoms = system.atoms[[0, 6]]
+        eq_(atoms[1].type_array, 'O')
+        assert_allclose(atoms[1].r_array, system.r_array[6])
+
+        # Negative indices count from the end
+        assert_allclose(system.molecules[-1].r_array, system.r_array[9:12])
+        mols = system.molecules[np.array([-2])]
+        assert_allclose(mols[0].r_array, mol.r_array)
+        eq_(system.atoms[[-1]][0].type_array, 'H')
+
+        with assert_raises(IndexError):
+            system.molecules[np.array([4])]
+        with assert_raises(IndexError):
+            system.molecules[np.array([True])]
+        with assert_raises(IndexError):
+            system.atoms[np.array([True, False, True, True])]
+        with assert_raises(IndexError):
+            system.atoms[[12]]
+
+    def test_get_molecules_unsorted(self):
+        # Atoms of different molecules are interleaved
+        system = System.from_arrays(
+            type_array=['O', 'N', 'H', 'H', 'H', 'H'],
+            bonds=[[0, 2], [1, 3], [0, 4], [1, 5]],
+            maps={('atom', 'molecule'): [0, 1, 0, 1, 0, 1],
+                  ('bond', 'molecule'): [0, 1, 0, 1]})
+
+        mols = system.molecules[:]
+        assert_npequal(mols[0].type_array, ['O', 'H', 'H'])
+        assert_npequal(mols[1].type_array, ['N', 'H', 'H'])
+        assert_eqbonds(mols[1].bonds, [[0, 1], [0, 2]])
+
     def test_subsystem_from_molecules(self):
         mols = self._make_molecules()
         system = System(mols)
@@ -179,6 +311,14 @@ class TestWhere(object):
                                      True, True, True])
         assert_npequal(idx['molecule'], [True, False, True])
 
+    def test_atom_mask(self):
+        idx = self.s.where(atom_index=np.array([False, False, False, True,
+                                                False, False, False, False,
+                                                False]))
+        assert_npequal(idx['atom'], [False, False, False, True, False, False,
+                                     False, False, False])
+        assert_npequal(idx['molecule'], [False, True, False])
+
     def test_atom_type(self):
         self.s = System.from_arrays(
             type_array=['Cl', 'Cl', 'O', 'H', 'H', 'O', 'H', 'H', 'O', 'H',
@@ -219,6 +359,38 @@ def test_crystal():
     eq_(tsys.r_array.max(), 12.5)
 
 
+def test_merge_systems():
+    wat = _make_water()
+    na = Molecule([Atom('Na', [0.0, 0.0, 0.0])])
+    sysa = System([wat, wat.copy()], box_vectors=np.eye(3) * 20.0)
+    sysb = System([na])
+    sysb.r_array += 10.0
+
+    sysres = merge_systems(sysa, sysb)
+    eq_(sysres.n_mol, 3)
+    eq_(sysres.n_atoms, 7)
+    assert_npequal(sysres.mol_indices, [0, 3, 6])
+    assert_npequal(sysres.mol_n_atoms, [3, 3, 1])
+    assert_npequal(sysres.type_array, ['O', 'H', 'H', 'O', 'H', 'H', 'Na'])
+
+    # The atoms of sysa overlapping with sysb are removed
+    sysb.r_array = wat.r_array[:1]
+    sysres = merge_systems(sysa, sysb)
+    eq_(sysres.n_atoms, 5)
+    assert_npequal(sysres.mol_indices, [0, 2, 4])
+    assert_npequal(sysres.type_array, ['H', 'H', 'H', 'H', 'Na'])
+
+    # Systems without a box are not periodic
+    sysa = System([wat, wat.copy()])
+    sysb.r_array = wat.r_array[:1]
+    sysres = merge_systems(sysa, sysb)
+    assert_npequal(sysres.type_array, ['H', 'H', 'H', 'H', 'Na'])
+
+    sysa = System([wat, wat.copy()])
+    sysb.r_array = wat.r_array[:1] + 10.0
+    eq_(merge_systems(sysa, sysb).n_atoms, 7)
+
+
 def test_sort():
     na = Molecule([Atom('Na', [0.0, 0.0, 0.0])])
     cl = Molecule([Atom('Cl', [0.0, 0.0, 0.0])])
@@ -3,10 +3,11 @@ import numpy as np
 
 from chemlab.core import *
 from chemlab.io import datafile
-from chemlab.md.analysis import rdf
+from chemlab.md.analysis import rdf, rdf_multi
 
 from chemlab.md.potential import ForceGenerator, InterMolecular, IntraMolecular, to_top
-from nose.tools import eq_
+from nose.tools import assert_raises, eq_
+from .testtools import assert_npequal
 
 stretch_k_ij = {
     ('H_','H_') : 1.0
@@ -78,3 +79,62 @@ def test_rdf():
     
     mse = ((rdf_[1] - gro_rdf[1, :-2])**2).mean()
     assert mse < 1.0
+
+def test_rdf_neighbor_path():
+    np.random.seed(0)
+    coords = np.random.random((300, 3)) * 2.0
+    box = np.eye(3) * 2.0
+
+    # A short cutoff visits only the neighbors, a long one all the pairs
+    _, hist_short = rdf(coords, coords, binsize=0.01, cutoff=0.3,
+                        periodic=box, normalize=False)
+    _, hist_long = rdf(coords, coords, binsize=0.01, cutoff=0.99,
+                       periodic=box, normalize=False)
+
+    # The last bin of the short cutoff is only partially filled
+    assert_npequal(hist_short[:-1], hist_long[:len(hist_short) - 1])
+
+def test_rdf_multi():
+    np.random.seed(0)
+    frames = [np.random.random((200, 3)) * 2.0 for _ in range(5)]
+    boxes = [np.eye(3) * 2.0] * 5
+    sel = np.ones(200, dtype='bool')
+
+    bins, hist = rdf_multi(frames, frames, sel, sel, boxes,
+                           binsize=0.01, n_jobs=1)
+    bins_p, hist_p = rdf_multi(frames, frames, sel, sel, boxes,
+                               binsize=0.01, n_jobs=3)
+    assert_npequal(bins, bins_p)
+    assert_npequal(hist, hist_p)
+
+    # Uniformly distributed points have g(r) close to 1
+    assert abs(hist[20:].mean() - 1.0) < 0.1
+
+def test_rdf_out():
+    np.random.seed(0)
+    coords_a = np.random.random((200, 3)) * 2.0
+    coords_b = np.random.random((200, 3)) * 2.0
+    box = np.eye(3) * 2.0
+
+    _, hist_a = rdf(coords_a, coords_a, binsize=0.01, cutoff=0.9,
+                    periodic=box, normalize=False)
+    _, hist_b = rdf(coords_b, coords_b, binsize=0.01, cutoff=0.9,
+                    periodic=box, normalize=False)
+
+    # Two frames accumulated in the same buffer
+    out = np.zeros(91, dtype=np.int64)
+    rdf(coords_a, coords_a, binsize=0.01, cutoff=0.9, periodic=box,
+        normalize=False, out=out)
+    rdf(coords_b, coords_b, binsize=0.01, cutoff=0.9, periodic=box,
+        normalize=False, out=out)
+    assert_npequal(out, hist_a + hist_b)
+
+    with assert_raises(ValueError):
+        rdf(coords_a, coords_a, binsize=0.01, cutoff=0.9, periodic=box,
+            normalize=True, out=out)
+    with assert_raises(ValueError):
+        rdf(coords_a, coords_a, binsize=0.01, cutoff=0.9, periodic=box,
+            normalize=False, out=np.zeros(91))
+    with assert_raises(ValueError):
+        rdf(coords_a, coords_a, binsize=0.01, cutoff=0.9, periodic=box,
+            normalize=False, out=np.zeros(50, dtype=np.int64))
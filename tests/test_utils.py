@@ -5,7 +5,10 @@ import numpy as np
 # import dask.array as da
 from chemlab.utils.pbc import distance_matrix, minimum_image, noperiodic
 from chemlab.utils.geometry import cartesian_to_spherical
-from chemlab.utils.neighbors import count_neighbors, nearest_neighbors
+from chemlab.utils.neighbors import (count_neighbors, nearest_neighbors,
+                                     neighbor_list)
+from chemlab.utils.distances import overlapping_points, distances_within
+from chemlab.utils.cdist import distance_histogram
 from .testtools import npeq_
 
 import time
@@ -74,3 +77,38 @@ def test_neighbors():
 
     npeq_(c[0], close)
     npeq_(c[1], [close[1]])
+
+def test_overlapping_points():
+    coords_a = np.array([[0.0, 0.0, 0.0], [0.5, 0.5, 0.5]])
+    coords_b = np.array([[0.05, 0.0, 0.0], [0.3, 0.3, 0.3], [0.98, 0.0, 0.0]])
+
+    npeq_(overlapping_points(coords_a, coords_b, 0.1), [0])
+    # The last point overlaps through the periodic boundary
+    npeq_(overlapping_points(coords_a, coords_b, 0.1,
+                             periodic=np.array([1.0, 1.0, 1.0])), [0, 2])
+    # A zero box is not periodic
+    npeq_(overlapping_points(coords_a, coords_b, 0.1,
+                             periodic=np.zeros(3)), [0])
+
+def test_distance_histogram():
+    coords = np.random.random((50, 3))
+    periodic = np.array([1.0, 1.0, 1.0])
+    binsize = 0.01
+
+    hist = np.zeros(51, dtype=np.int64)
+    distance_histogram(coords, coords, periodic, 0.5, binsize, hist)
+
+    distances = distances_within(coords, coords, 0.5, periodic)
+    expected = np.bincount(np.rint(distances/binsize).astype(int), minlength=51)
+    npeq_(hist, expected)
+
+def test_neighbor_list():
+    coords_a = np.random.random((20, 3))
+    coords_b = np.random.random((30, 3))
+    periodic = np.array([1.0, 1.0, 1.0])
+
+    ilist, irange, jlist = neighbor_list(coords_a, coords_b, periodic, 0.3)
+    dist = distance_matrix(coords_b, coords_a, periodic)
+    for k, i in enumerate(ilist):
+        npeq_(np.sort(jlist[irange[k]:irange[k+1]]),
+              np.flatnonzero(dist[i] <= 0.3))